@@ -0,0 +1,4 @@
+from .grobid_client import main
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 """ Generic API Client """
-from copy import deepcopy
+import io
 import json
+import os
 import requests
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
 
 try:
     from urlparse import urljoin
@@ -9,6 +12,70 @@ except ImportError:
     from urllib.parse import urljoin
 
 
+class MultipartFileBody(object):
+    """File-like ``multipart/form-data`` body for uploading one file.
+
+    The form fields are encoded upfront, while the uploaded file is only read
+    chunk by chunk as the request is being sent, so that its content is never
+    entirely held in memory. The body is passed as ``data`` of the request, with
+    ``content_type`` as Content-Type header.
+    """
+
+    def __init__(self, fields, name, filename, file_handle, content_type, headers=None):
+        """Initialise the body.
+
+        Args:
+            fields (dict): Form fields, a list value giving one part per item.
+            name (str): Name of the form field of the file.
+            filename (str): File name sent for the file.
+            file_handle (file): File opened in binary mode, positioned at its start.
+            content_type (str): Content type of the file.
+            headers (dict or None): Extra headers of the file part.
+        """
+        boundary = choose_boundary()
+        head = io.BytesIO()
+        for field_name, values in fields.items():
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            for value in values:
+                field = RequestField(field_name, value)
+                field.make_multipart()
+                head.write(self._part(boundary, field) + str(value).encode("utf-8") + b"\r\n")
+        field = RequestField(name, None, filename=filename, headers=headers)
+        field.make_multipart(content_type=content_type)
+        head.write(self._part(boundary, field))
+        tail = ("\r\n--%s--\r\n" % boundary).encode("latin-1")
+
+        self.content_type = "multipart/form-data; boundary=%s" % boundary
+        self.len = len(head.getvalue()) + os.fstat(file_handle.fileno()).st_size + len(tail)
+        self._parts = [head, file_handle, io.BytesIO(tail)]
+        self._current = 0
+        head.seek(0)
+
+    @staticmethod
+    def _part(boundary, field):
+        return ("--%s\r\n" % boundary).encode("latin-1") + field.render_headers().encode("utf-8")
+
+    def read(self, size=-1):
+        """Read up to size bytes of the body, all the remaining ones if size is negative."""
+        chunks = []
+        while self._current < len(self._parts) and size != 0:
+            chunk = self._parts[self._current].read(size)
+            if not chunk:
+                self._current += 1
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+    def rewind(self):
+        """Go back to the start of the body, to send it again."""
+        for part in self._parts:
+            part.seek(0)
+        self._current = 0
+
+
 class ApiClient(object):
     """Client to interact with a generic Rest API.
 
@@ -18,6 +85,7 @@ class ApiClient(object):
 
     accept_type = "application/xml"
     api_base = None
+    session = None
 
     def __init__(
         self, base_url, username=None, api_key=None, status_endpoint=None, timeout=60
@@ -111,14 +179,19 @@ class ApiClient(object):
         Returns:
             ResultParser or ErrorParser.
         """
-        headers = deepcopy(headers) or {}
+        # headers and params are flat dicts of strings, a shallow copy protects the
+        # caller's dicts (shared between requests) without a deep copy per request
+        headers = dict(headers or {})
         headers["Accept"] = self.accept_type
-        params = deepcopy(params) or {}
+        params = dict(params or {})
         data = data or {}
         files = files or {}
         # if self.username is not None and self.api_key is not None:
         #    params.update(self.get_credentials())
-        r = requests.request(
+        # go through the persistent session when there is one, so that
+        # connections are kept alive and reused across calls
+        requester = self.session if self.session is not None else requests
+        r = requester.request(
             method,
             url,
             headers=headers,
@@ -3,28 +3,45 @@
 Grobid Python Client
 
 This version uses the standard ThreadPoolExecutor for parallelizing the
-concurrent calls to the GROBID services.  Given the limits of
-ThreadPoolExecutor (input stored in memory, blocking Executor.map until the 
-whole input is acquired), it works with batches of PDF of a size indicated 
-in the config.json file (default is 1000 entries). We are moving from first 
-batch to the second one only when the first is entirely processed - which 
-means it is slightly sub-optimal, but should scale better. Working without 
-batch would mean acquiring a list of millions of files in directories and 
-would require something scalable too (e.g. done in a separate thread), 
-which is not implemented for the moment.
+concurrent calls to the GROBID services. The files to process are acquired 
+lazily from the input directories, while the previous files are being 
+processed. At most a number of files indicated in the config.json file by 
+batch_size (default is 1000 entries) are submitted to the executor at the 
+same time, and a new file is submitted as soon as a previous one is 
+completed. There is therefore no wait between batches, and the memory used 
+does not depend on the number of files in the input directories.
 
 """
 import os
-import io
 import json
+import sys
+import logging
 import argparse
 import time
+import random
 import concurrent.futures
-import ntpath
+import functools
 import requests
-import pathlib
+from requests.adapters import HTTPAdapter
 
-from .client import ApiClient
+from .client import ApiClient, MultipartFileBody
+
+logger = logging.getLogger("grobid_client")
+
+
+def _console_logging(verbose=False):
+    """
+    Print the messages of the client on the standard output, unless logging has
+    been configured by the application. verbose adds the per file messages.
+    """
+    if not logger.hasHandlers():
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        if logger.level == logging.NOTSET:
+            logger.setLevel(logging.INFO)
+    if verbose and logger.getEffectiveLevel() > logging.DEBUG:
+        logger.setLevel(logging.DEBUG)
 
 
 class ServerUnavailableException(Exception):
@@ -37,6 +54,8 @@ class GrobidClient(ApiClient):
                  coordinates=["persName", "figure", "ref", "biblStruct", "formula", "s", "note", "title"], 
                  sleep_time=5,
                  timeout=60,
+                 max_retries=5,
+                 max_sleep_time=60,
                  config_path=None, 
                  check_server=True):
         self.config = {
@@ -44,8 +63,19 @@ class GrobidClient(ApiClient):
             'batch_size': batch_size,
             'coordinates': coordinates,
             'sleep_time': sleep_time,
-            'timeout': timeout
+            'timeout': timeout,
+            'max_retries': max_retries,
+            'max_sleep_time': max_sleep_time
         }
+        _console_logging()
+        self._service_urls = {}
+        self._request_data_cache = {}
+        # a single session shared by all the worker threads, so that the
+        # connections to the GROBID server are pooled and kept alive
+        self.session = requests.Session()
+        self._pool_size = None
+        self._adapter = None
+        self._set_pool_size(10)
         if config_path:
             self._load_config(config_path)
         if check_server:
@@ -55,40 +85,67 @@ class GrobidClient(ApiClient):
         """
         Load the json configuration
         """
-        config_json = open(path).read()
-        self.config = json.loads(config_json)
-
-    def _test_server_connection(self):
+        # the values missing from the file keep the ones given to the constructor
+        with open(path) as config_file:
+            self.config.update(json.load(config_file))
+        # the server or the coordinates may have changed, drop the cached values
+        self._service_urls = {}
+        self._request_data_cache = {}
+
+    def _set_pool_size(self, pool_size):
+        """
+        Size the connection pool of the session to the number of concurrent workers
+        """
+        # mounting a new adapter drops the open connections, so it is done only
+        # when the size actually changes
+        if pool_size == self._pool_size:
+            return
+        # the replaced adapter is closed so that its kept-alive sockets are released
+        if self._adapter is not None:
+            self._adapter.close()
+        # all the requests go to the same GROBID server, so one host pool is enough
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._pool_size = pool_size
+
+    def _test_server_connection(self, timeout=(3, 5)):
         """Test if the server is up and running."""
         the_url = self.get_server_url("isalive")
         try:
-            r = requests.get(the_url)
-        except:
-            print("GROBID server does not appear up and running, the connection to the server failed")
+            # short (connect, read) timeout so that an unresponsive server does not block
+            # the client. The connection stays in the session pool and is reused by
+            # process() only with the default n of 10, another n mounts a new pool
+            r = self.session.get(the_url, timeout=timeout)
+        except requests.exceptions.RequestException:
+            logger.error("GROBID server does not appear up and running, the connection to the server failed")
             raise ServerUnavailableException
 
         status = r.status_code
 
         if status != 200:
-            print("GROBID server does not appear up and running " + str(status))
+            logger.error("GROBID server does not appear up and running %s", status)
             return False, status
         else:
-            print("GROBID server is up and running")
+            logger.info("GROBID server is up and running")
             return True, status
 
     def _output_file_name(self, input_file, input_path, output):
-        # we use ntpath here to be sure it will work on Windows too
+        # the input extension is replaced in a single pass on the path, os.path
+        # being ntpath on Windows this works there too
         if output is not None:
-            input_file_name = str(os.path.relpath(os.path.abspath(input_file), input_path))
+            # files found by walking input_path start with it, the relative path is
+            # then obtained without resolving both paths as relpath does
+            prefix = os.path.join(input_path, "")
+            if input_file.startswith(prefix):
+                input_file_name = input_file[len(prefix):]
+            else:
+                input_file_name = os.path.relpath(input_file, input_path)
             filename = os.path.join(
                 output, os.path.splitext(input_file_name)[0] + ".grobid.tei.xml"
             )
         else:
-            input_file_name = ntpath.basename(input_file)
-            filename = os.path.join(
-                ntpath.dirname(input_file),
-                os.path.splitext(input_file_name)[0] + ".grobid.tei.xml",
-            )
+            filename = os.path.splitext(input_file)[0] + ".grobid.tei.xml"
 
         return filename
 
@@ -116,60 +173,98 @@ class GrobidClient(ApiClient):
         verbose=False,
         flavor=None
     ):
-        batch_size_pdf = self.config["batch_size"]
-        input_files = []
-
-        for (dirpath, dirnames, filenames) in os.walk(input_path):
-            for filename in filenames:
-                if filename.endswith(".pdf") or filename.endswith(".PDF") or \
-                    (service == 'processCitationList' and (filename.endswith(".txt") or filename.endswith(".TXT"))) or \
-                    (service == 'processCitationPatentST36' and (filename.endswith(".xml") or filename.endswith(".XML"))):
-                    if verbose:
-                        try:
-                            print(filename)
-                        except Exception:
-                            # may happen on linux see https://stackoverflow.com/questions/27366479/python-3-os-walk-file-paths-unicodeencodeerror-utf-8-codec-cant-encode-s
-                            pass
-                    input_files.append(os.sep.join([dirpath, filename]))
-
-                    if len(input_files) == batch_size_pdf:
-                        self.process_batch(
-                            service,
-                            input_files,
-                            input_path,
-                            output,
-                            n,
-                            generateIDs,
-                            consolidate_header,
-                            consolidate_citations,
-                            include_raw_citations,
-                            include_raw_affiliations,
-                            tei_coordinates,
-                            segment_sentences,
-                            force,
-                            verbose,
-                            flavor
-                        )
-                        input_files = []
-
-        # last batch
-        if len(input_files) > 0:
-            self.process_batch(
-                service,
-                input_files,
-                input_path,
-                output,
-                n,
-                generateIDs,
-                consolidate_header,
-                consolidate_citations,
-                include_raw_citations,
-                include_raw_affiliations,
-                tei_coordinates,
-                segment_sentences,
-                force,
-                verbose,
-            )
+        # os.scandir(None) would list the current directory
+        if input_path is None:
+            raise ValueError("input_path must be the directory containing the files to process")
+        _console_logging(verbose)
+        self._set_pool_size(n)
+        worker = self._worker(
+            service,
+            generateIDs,
+            consolidate_header,
+            consolidate_citations,
+            include_raw_citations,
+            include_raw_affiliations,
+            tei_coordinates,
+            segment_sentences,
+            flavor
+        )
+
+        # the input files are acquired lazily while the previous ones are processed,
+        # so that only the files in flight are held in memory whatever the size of
+        # the corpus
+        input_files = self._iter_input_files(input_path, service, output, force, verbose)
+        # we use ThreadPoolExecutor and not ProcessPoolExecutor because it is an I/O intensive process
+        with concurrent.futures.ThreadPoolExecutor(max_workers=n) as executor:
+            self._process_files(worker, input_files, executor, max(n, self.config["batch_size"]), verbose)
+
+    def _iter_input_files(self, input_path, service, output=None, force=True, verbose=False):
+        """
+        Yield the paths of the files to be processed under input_path, together with
+        the path of their TEI result. Unless force is set, files with an already
+        produced TEI result are skipped here, before being submitted.
+        """
+        extensions = (".pdf",)
+        if service == 'processCitationList':
+            extensions += (".txt",)
+        elif service == 'processCitationPatentST36':
+            extensions += (".xml",)
+
+        # the results already produced are found by listing each result directory
+        # once, instead of testing the existence of each result file
+        listing = {}
+
+        for entry in self._walk(input_path):
+            # all the accepted extensions have 4 characters
+            if entry.name[-4:].lower() in extensions:
+                if verbose:
+                    logger.debug("%s", entry.name)
+                filename = self._output_file_name(entry.path, input_path, output)
+                if not force and self._listed(filename, listing):
+                    logger.info("%s already exist, skipping... (use --force to reprocess pdf input files)", filename)
+                    continue
+                yield entry.path, filename
+
+    @staticmethod
+    def _listed(filename, listing):
+        """
+        Check if filename is present in its directory. The files of the directory are
+        listed once, on its first check, and kept in listing until a file of another
+        directory is checked: as the input tree is walked directory by directory, the
+        results of the files of an input directory all go to the same directory.
+        """
+        directory, name = os.path.split(filename)
+        if listing.get("directory") != directory:
+            try:
+                names = set(os.listdir(directory or "."))
+            except OSError:
+                names = set()
+            listing["directory"] = directory
+            listing["names"] = names
+        return name in listing["names"]
+
+    @staticmethod
+    def _walk(path):
+        """
+        Yield the entries of the files under path, walking the directory tree
+        with os.scandir
+        """
+        directories = [path]
+        while directories:
+            directory = directories.pop()
+            try:
+                entries = os.scandir(directory)
+            except OSError:
+                # as with os.walk, a directory which cannot be listed is skipped and
+                # the other files are still processed
+                logger.warning("Listing the directory %s failed, skipping it", directory)
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
 
     def process_batch(
         self,
@@ -187,70 +282,123 @@ class GrobidClient(ApiClient):
         segment_sentences,
         force,
         verbose=False,
-        flavor=None
+        flavor=None,
+        executor=None
     ):
+        _console_logging(verbose)
+        self._set_pool_size(n)
         if verbose:
-            print(len(input_files), "files to process in current batch")
+            logger.debug("%d files to process in current batch", len(input_files))
 
-        # we use ThreadPoolExecutor and not ProcessPoolExecutor because it is an I/O intensive process
-        with concurrent.futures.ThreadPoolExecutor(max_workers=n) as executor:
-            #with concurrent.futures.ProcessPoolExecutor(max_workers=n) as executor:
-            results = []
-            for input_file in input_files:
-                # check if TEI file is already produced
-                filename = self._output_file_name(input_file, input_path, output)
-                if not force and os.path.isfile(filename):
-                    print(filename, "already exist, skipping... (use --force to reprocess pdf input files)")
-                    continue
+        to_process = []
+        for input_file in input_files:
+            # check if TEI file is already produced
+            filename = self._output_file_name(input_file, input_path, output)
+            if not force and os.path.isfile(filename):
+                logger.info("%s already exist, skipping... (use --force to reprocess pdf input files)", filename)
+                continue
+            to_process.append((input_file, filename))
+
+        worker = self._worker(
+            service,
+            generateIDs,
+            consolidate_header,
+            consolidate_citations,
+            include_raw_citations,
+            include_raw_affiliations,
+            tei_coordinates,
+            segment_sentences,
+            flavor
+        )
+        max_in_flight = max(n, len(to_process))
+        if executor is None:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=n) as executor:
+                self._process_files(worker, to_process, executor, max_in_flight, verbose)
+        else:
+            self._process_files(worker, to_process, executor, max_in_flight, verbose)
 
-                selected_process = self.process_pdf
-                if service == 'processCitationList':
-                    selected_process = self.process_txt
+    def _worker(
+        self,
+        service,
+        generateIDs,
+        consolidate_header,
+        consolidate_citations,
+        include_raw_citations,
+        include_raw_affiliations,
+        tei_coordinates,
+        segment_sentences,
+        flavor=None
+    ):
+        """
+        Return the process function for the service, with the GROBID parameters bound:
+        they are the same for all the files of a run, so they are bound once here
+        rather than passed again for every submitted file
+        """
+        selected_process = self.process_pdf
+        if service == 'processCitationList':
+            selected_process = self.process_txt
+
+        parameters = {
+            "generateIDs": generateIDs,
+            "consolidate_header": consolidate_header,
+            "consolidate_citations": consolidate_citations,
+            "include_raw_citations": include_raw_citations,
+            "include_raw_affiliations": include_raw_affiliations,
+            "tei_coordinates": tei_coordinates,
+            "segment_sentences": segment_sentences,
+        }
+        if selected_process == self.process_pdf:
+            parameters["flavor"] = flavor
+        return functools.partial(selected_process, service, **parameters)
 
-                if verbose:
-                    print(f"Adding {input_file} to the queue.")
-                
-                r = executor.submit(
-                    selected_process,
-                    service,
-                    input_file,
-                    generateIDs,
-                    consolidate_header,
-                    consolidate_citations,
-                    include_raw_citations,
-                    include_raw_affiliations,
-                    tei_coordinates,
-                    segment_sentences,
-                    flavor,
-                    -1,
-                    -1)
-
-                results.append(r)
-
-        for r in concurrent.futures.as_completed(results):
-            input_file, status, text = r.result()
-            filename = self._output_file_name(input_file, input_path, output)
+    def _process_files(self, worker, input_files, executor, max_in_flight, verbose=False):
+        """
+        Submit the (input file, output file) pairs to the executor, keeping at most
+        max_in_flight of them submitted at the same time: a new file is submitted as
+        soon as a previous one is completed, and each result is written as soon as
+        it is available. Returns when all the files are processed.
+        """
+        in_flight = {}
+        created_dirs = set()
+        for input_file, filename in input_files:
+            if len(in_flight) >= max_in_flight:
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    self._write_result(in_flight.pop(future), *future.result(), created_dirs=created_dirs)
+
+            if verbose:
+                logger.debug("Adding %s to the queue.", input_file)
+            in_flight[executor.submit(worker, input_file)] = filename
+
+        # the futures are dropped as they are handled, so that their result is freed
+        # once written
+        for future in concurrent.futures.as_completed(in_flight):
+            self._write_result(in_flight.pop(future), *future.result(), created_dirs=created_dirs)
+
+    def _write_result(self, filename, input_file, status, content, created_dirs=None):
+        # GROBID responses are UTF-8, they are written to disk as received
+        if status != 200 or content is None:
+            text = content.decode("utf8", errors="replace") if content is not None else None
+            logger.warning("Processing of %s failed with error %s, %s", input_file, status, text)
+            # writing error file with suffixed error code
+            result_file = filename.replace(".grobid.tei.xml", "_"+str(status)+".txt")
+        else:
+            # writing TEI file
+            result_file = filename
 
-            if status != 200 or text is None:
-                print("Processing of", input_file, "failed with error", str(status), ",", text)
-                # writing error file with suffixed error code
-                try:
-                    pathlib.Path(os.path.dirname(filename)).mkdir(parents=True, exist_ok=True)
-                    with open(filename.replace(".grobid.tei.xml", "_"+str(status)+".txt"), 'w', encoding='utf8') as tei_file:
-                        if text is not None:
-                            tei_file.write(text)
-                        else:
-                            tei_file.write("")
-                except OSError:
-                    print("Writing resulting TEI XML file", filename, "failed")
-            else:
-                # writing TEI file
-                try:
-                    pathlib.Path(os.path.dirname(filename)).mkdir(parents=True, exist_ok=True)
-                    with open(filename,'w',encoding='utf8') as tei_file:
-                        tei_file.write(text)
-                except OSError:
-                   print("Writing resulting TEI XML file", filename, "failed")
+        try:
+            # results go to a few directories, each is created only once per run
+            directory = os.path.dirname(result_file)
+            if created_dirs is None or directory not in created_dirs:
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                if created_dirs is not None:
+                    created_dirs.add(directory)
+            with open(result_file, 'wb') as tei_file:
+                if content is not None:
+                    tei_file.write(content)
+        except OSError:
+            logger.error("Writing resulting TEI XML file %s failed", filename)
 
     def process_pdf(
         self,
@@ -267,71 +415,126 @@ class GrobidClient(ApiClient):
         start=-1,
         end=-1
     ):
-        pdf_handle = open(pdf_file, "rb")
-        files = {
-            "input": (
-                pdf_file,
-                pdf_handle,
-                "application/pdf",
-                {"Expires": "0"},
-            )
-        }
-        
         the_url = self.get_server_url(service)
 
         # set the GROBID parameters
-        the_data = {}
-        if generateIDs:
-            the_data["generateIDs"] = "1"
-        if consolidate_header:
-            the_data["consolidateHeader"] = "1"
-        if consolidate_citations:
-            the_data["consolidateCitations"] = "1"
-        if include_raw_citations:
-            the_data["includeRawCitations"] = "1"
-        if include_raw_affiliations:
-            the_data["includeRawAffiliations"] = "1"
-        if tei_coordinates:
-            the_data["teiCoordinates"] = self.config["coordinates"]
-        if segment_sentences:
-            the_data["segmentSentences"] = "1"
-        if flavor:
-            the_data["flavor"] = flavor
-        if start > 0:
-            the_data["start"] = str(start)
-        if end > 0:
-            the_data["end"] = str(end)
+        the_data = self._request_data(
+            generateIDs,
+            consolidate_header,
+            consolidate_citations,
+            include_raw_citations,
+            include_raw_affiliations,
+            tei_coordinates,
+            segment_sentences,
+            flavor
+        )
+        if start > 0 or end > 0:
+            # page range is specific to this call, the shared parameters are not modified
+            the_data = dict(the_data)
+            if start > 0:
+                the_data["start"] = str(start)
+            if end > 0:
+                the_data["end"] = str(end)
+
+        # the PDF is only opened when the worker actually sends it, and the handle
+        # is released whatever the outcome of the request. It is streamed to the
+        # server rather than loaded in memory with the rest of the request body
+        with open(pdf_file, "rb") as pdf_handle:
+            body = MultipartFileBody(
+                the_data, "input", os.path.basename(pdf_file), pdf_handle, "application/pdf", {"Expires": "0"}
+            )
+            try:
+                res, status = self._post_with_retries(
+                    the_url, data=body, headers={"Accept": "text/plain", "Content-Type": body.content_type}
+                )
+            except requests.exceptions.ReadTimeout:
+                return (pdf_file, 408, None)
 
-        try:
+        return (pdf_file, status, res.content)
+
+    def _post_with_retries(self, url, data, headers):
+        """
+        POST to a GROBID service. When the server answers 503 (all its threads are
+        busy), the request is sent again after a wait, at most max_retries times.
+        """
+        max_retries = self.config["max_retries"]
+        for attempt in range(max_retries + 1):
             res, status = self.post(
-                url=the_url, files=files, data=the_data, headers={"Accept": "text/plain"}, timeout=self.config['timeout']
+                url=url, data=data, headers=headers, timeout=self.config['timeout']
             )
+            if status != 503 or attempt == max_retries:
+                break
 
-            if status == 503:
-                time.sleep(self.config["sleep_time"])
-                return self.process_pdf(
-                    service,
-                    pdf_file,
-                    generateIDs,
-                    consolidate_header,
-                    consolidate_citations,
-                    include_raw_citations,
-                    include_raw_affiliations,
-                    tei_coordinates,
-                    segment_sentences,
-                    start,
-                    end,
-                    flavor
-                )
-        except requests.exceptions.ReadTimeout:
-            pdf_handle.close()
-            return (pdf_file, 408, None)
+            time.sleep(self._retry_delay(res, attempt + 1))
+            # a streamed body has been consumed, it is re-sent from the start
+            if isinstance(data, MultipartFileBody):
+                data.rewind()
 
-        pdf_handle.close()
-        return (pdf_file, status, res.text)
+        return res, status
+
+    def _retry_delay(self, res, attempt):
+        """
+        Return the wait before a new attempt after a 503 answer: the delay given in
+        seconds by the Retry-After header of the answer if any, otherwise a delay
+        doubling at each attempt (plus up to half of it at random). The delay is
+        capped by max_sleep_time.
+        """
+        max_sleep_time = self.config["max_sleep_time"]
+        retry_after = res.headers.get("Retry-After", "").strip()
+        if retry_after.isdigit():
+            return min(int(retry_after), max_sleep_time)
+        # the random part spreads the retries of the workers which got a 503
+        # at the same time
+        delay = min(self.config["sleep_time"] * 2 ** (attempt - 1), max_sleep_time)
+        return delay + random.uniform(0, delay / 2)
+
+    def _request_data(
+        self,
+        generateIDs,
+        consolidate_header,
+        consolidate_citations,
+        include_raw_citations,
+        include_raw_affiliations,
+        tei_coordinates,
+        segment_sentences,
+        flavor=None
+    ):
+        """
+        Return the GROBID parameters corresponding to the given flags. The flags are
+        the same for all the files of a run, so the parameters are built once and
+        then shared by the requests (they are not modified by requests).
+        """
+        key = (generateIDs, consolidate_header, consolidate_citations, include_raw_citations,
+               include_raw_affiliations, tei_coordinates, segment_sentences, flavor)
+        the_data = self._request_data_cache.get(key)
+        if the_data is None:
+            the_data = {}
+            if generateIDs:
+                the_data["generateIDs"] = "1"
+            if consolidate_header:
+                the_data["consolidateHeader"] = "1"
+            if consolidate_citations:
+                the_data["consolidateCitations"] = "1"
+            if include_raw_citations:
+                the_data["includeRawCitations"] = "1"
+            if include_raw_affiliations:
+                the_data["includeRawAffiliations"] = "1"
+            if tei_coordinates:
+                the_data["teiCoordinates"] = self.config["coordinates"]
+            if segment_sentences:
+                the_data["segmentSentences"] = "1"
+            if flavor:
+                the_data["flavor"] = flavor
+            self._request_data_cache[key] = the_data
+        return the_data
 
     def get_server_url(self, service):
-        return self.config['grobid_server'] + "/api/" + service
+        # built once per service, as it is requested for every processed file
+        url = self._service_urls.get(service)
+        if url is None:
+            url = self.config['grobid_server'] + "/api/" + service
+            self._service_urls[service] = url
+        return url
 
     def process_txt(
         self,
@@ -352,32 +555,20 @@ class GrobidClient(ApiClient):
 
         the_url = self.get_server_url(service)
 
-        # set the GROBID parameters
-        the_data = {}
-        if consolidate_citations:
-            the_data["consolidateCitations"] = "1"
-        if include_raw_citations:
-            the_data["includeRawCitations"] = "1"
-        the_data["citations"] = references
-        res, status = self.post(
-            url=the_url, data=the_data, headers={"Accept": "application/xml"}
+        # set the GROBID parameters, only the citation ones apply to a list of
+        # references, the shared parameters are copied to add the references
+        the_data = dict(
+            self._request_data(False, False, consolidate_citations, include_raw_citations, False, False, False),
+            citations=references
         )
-
-        if status == 503:
-            time.sleep(self.config["sleep_time"])
-            return self.process_txt(
-                service,
-                txt_file,
-                generateIDs,
-                consolidate_header,
-                consolidate_citations,
-                include_raw_citations,
-                include_raw_affiliations,
-                tei_coordinates,
-                segment_sentences
+        try:
+            res, status = self._post_with_retries(
+                the_url, data=the_data, headers={"Accept": "application/xml"}
             )
+        except requests.exceptions.ReadTimeout:
+            return (txt_file, 408, None)
 
-        return (txt_file, status, res.text)
+        return (txt_file, status, res.content)
 
 def main():
     valid_services = [
@@ -408,7 +599,7 @@ def main():
         default="./config.json",
         help="path to the config file, default is ./config.json",
     )
-    parser.add_argument("--n", default=10, help="concurrency for service usage")
+    parser.add_argument("--n", type=int, default=10, help="concurrency for service usage")
     parser.add_argument(
         "--generateIDs",
         action="store_true",
@@ -463,17 +654,15 @@ def main():
 
     args = parser.parse_args()
 
+    # the messages of the client go to the standard output with the other messages
+    # of the command, the per file messages only when verbose
+    _console_logging(args.verbose)
+
     input_path = args.input
     config_path = args.config
     output_path = args.output
     flavor = args.flavor
-
-    if args.n is not None:
-        try:
-            n = int(args.n)
-        except ValueError:
-            print("Invalid concurrency parameter n:", n, ", n = 10 will be used by default")
-            pass
+    n = args.n
 
     # if output path does not exist, we create it
     if output_path is not None and not os.path.isdir(output_path):
@@ -500,6 +689,10 @@ def main():
         print("Missing or invalid service, must be one of", valid_services)
         exit(1)
 
+    if input_path is None:
+        print("Missing input directory, it must be given with --input")
+        exit(1)
+
     try:
         client = GrobidClient(config_path=config_path)
     except ServerUnavailableException: